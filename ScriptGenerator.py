@@ -1,11 +1,66 @@
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, TextIO, Tuple
+
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+if HAVE_LXML:
+    # Comments and processing instructions would otherwise show up as
+    # children and break the key/value pairing. Blank text between elements
+    # is only indentation in LLSD, so it is not kept either.
+    ITERPARSE_OPTIONS = {
+        'huge_tree': True,
+        'remove_comments': True,
+        'remove_pis': True,
+        'remove_blank_text': True,
+    }
+else:
+    # ElementTree's default tree builder already skips comments and PIs
+    ITERPARSE_OPTIONS = {}
+
+# Variable declarations and the opening of the default state
+LSL_HEADER = """float f;
+integer i;
+key k;
+list l;
+quaternion q;
+rotation r;
+string s;
+vector v;
+
+default
+{
+"""
+LSL_FOOTER = "}"
+
+# Whole script when keywords.xml yields nothing to emit
+EMPTY_SCRIPT = LSL_HEADER + LSL_FOOTER
+
+# Script variable used for each LSL type; anything unknown goes to the integer
+VAR_FOR_TYPE = {
+    'integer': 'i',
+    'float': 'f',
+    'string': 's',
+    'key': 'k',
+    'vector': 'v',
+    'rotation': 'r',
+    'list': 'l',
+}
+
+# Assignment line template for a constant of each LSL type
+CONSTANT_LINES = {const_type: f"        {var}={{name}};\n"
+                  for const_type, var in VAR_FOR_TYPE.items()}
 
 def parse_llsd_xml(xml_file_path: str) -> Dict[str, Any]:
-    """Parse the LLSD XML file and extract constants, events, and functions."""
-    
-    tree = ET.parse(xml_file_path)
-    root = tree.getroot()
+    """Parse the LLSD XML file and extract constants, events, and functions.
+
+    The file is streamed: each item map is parsed as soon as it is closed and
+    then discarded, so only one item is held in memory at a time.
+    """
     
     data = {
         'constants': {},
@@ -13,231 +68,203 @@ def parse_llsd_xml(xml_file_path: str) -> Dict[str, Any]:
         'functions': {}
     }
     
-    main_map = root.find('map')
-    if main_map is None:
-        return data
+    # Open elements from the root down, and the last <key> text per depth.
+    # Depth 1 is the main map, 2 a section map, 3 an item map.
+    stack = []
+    keys = {}
     
-    for i in range(0, len(main_map), 2):
-        if i + 1 >= len(main_map):
-            break
-            
-        key_elem = main_map[i]
-        value_elem = main_map[i + 1]
+    for event, elem in ET.iterparse(xml_file_path, events=('start', 'end'), **ITERPARSE_OPTIONS):
+        if event == 'start':
+            stack.append(elem)
+            continue
         
-        if key_elem.tag == 'key' and value_elem.tag == 'map':
-            section_name = key_elem.text
-            if section_name in data:
-                data[section_name] = parse_section(value_elem)
-    
-    return data
-
-def parse_section(section_map) -> Dict[str, Any]:
-    """Parse a section (constants, events, or functions) from the XML."""
-    section_data = {}
-    
-    for i in range(0, len(section_map), 2):
-        if i + 1 >= len(section_map):
-            break
-            
-        key_elem = section_map[i]
-        value_elem = section_map[i + 1]
+        stack.pop()
+        depth = len(stack)
+        if depth < 2 or stack[1].tag != 'map':
+            continue
+        
+        if elem.tag == 'key':
+            keys[depth] = elem.text
+            continue
+        
+        key_name = keys.pop(depth, None)
+        if depth == 3 and elem.tag == 'map' and stack[2].tag == 'map':
+            section_name = keys.get(2)
+            if section_name in data and key_name is not None:
+                data[section_name][key_name] = parse_item(elem)
         
-        if key_elem.tag == 'key' and value_elem.tag == 'map':
-            item_name = key_elem.text
-            item_data = parse_item(value_elem)
-            section_data[item_name] = item_data
+        # Drop everything that has been consumed at this level
+        if depth <= 3:
+            elem.clear()
+            del stack[-1][:-1]
     
-    return section_data
+    return data
 
 def parse_item(item_map) -> Dict[str, Any]:
     """Parse an individual item (constant, event, or function)."""
     item_data = {}
     
-    for i in range(0, len(item_map), 2):
-        if i + 1 >= len(item_map):
-            break
-            
-        key_elem = item_map[i]
-        value_elem = item_map[i + 1]
-        
+    children = iter(item_map)
+    for key_elem, value_elem in zip(children, children):
         if key_elem.tag == 'key':
             key_name = key_elem.text
-            item_data[key_name] = parse_value(value_elem)
+            # Most values are plain strings, so handle them without a call
+            if value_elem.tag == 'string':
+                item_data[key_name] = value_elem.text or ''
+            else:
+                item_data[key_name] = parse_value(value_elem)
     
     return item_data
 
+def parse_string_value(value_elem) -> str:
+    """Parse a <string> element."""
+    return value_elem.text or ''
+
+def parse_integer_value(value_elem) -> int:
+    """Parse an <integer> element, treating empty text as 0."""
+    text = value_elem.text
+    return int(text) if text else 0
+
+def parse_real_value(value_elem) -> float:
+    """Parse a <real> element, treating empty text as 0.0."""
+    text = value_elem.text
+    return float(text) if text else 0.0
+
+def parse_array_value(value_elem) -> List[Any]:
+    """Parse an <array> element into a list of values."""
+    return [parse_value(child) for child in value_elem]
+
+# Value parser for each LLSD tag; other tags yield their raw text
+VALUE_PARSERS = {
+    'string': parse_string_value,
+    'integer': parse_integer_value,
+    'real': parse_real_value,
+    'array': parse_array_value,
+    'map': parse_item,
+}
+
 def parse_value(value_elem):
     """Parse a value element based on its tag."""
-    if value_elem.tag == 'string':
-        return value_elem.text or ''
-    elif value_elem.tag == 'integer':
-        return int(value_elem.text) if value_elem.text else 0
-    elif value_elem.tag == 'real':
-        return float(value_elem.text) if value_elem.text else 0.0
-    elif value_elem.tag == 'array':
-        return [parse_value(child) for child in value_elem]
-    elif value_elem.tag == 'map':
-        return parse_item(value_elem)
-    else:
+    value_parser = VALUE_PARSERS.get(value_elem.tag)
+    if value_parser is None:
         return value_elem.text
+    return value_parser(value_elem)
+
+NO_PARAMETERS: Tuple[Tuple[str, str], ...] = ()
 
-def get_event_parameters(event_data: Dict[str, Any]) -> List[tuple]:
+def get_event_parameters(event_data: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
     """Extract parameter names and types from event data."""
-    parameters = []
-    if 'arguments' in event_data:
-        for arg_map in event_data['arguments']:
-            for param_name, param_data in arg_map.items():
-                param_type = param_data.get('type', 'integer')
-                parameters.append((param_name, param_type))
-    return parameters
-
-def generate_lsl_script(data: Dict[str, Any]) -> str:
-    """Generate a minimal LSL script for syntax highlighting testing."""
-    
-    lsl_lines = []
-    
-    # Variable declarations
-    lsl_lines.append("float f;")
-    lsl_lines.append("integer i;")
-    lsl_lines.append("key k;")
-    lsl_lines.append("list l;")
-    lsl_lines.append("quaternion q;")
-    lsl_lines.append("rotation r;")
-    lsl_lines.append("string s;")
-    lsl_lines.append("vector v;")
-    lsl_lines.append("")
-    
-    # Default state
-    lsl_lines.append("default")
-    lsl_lines.append("{")
+    arguments = event_data.get('arguments')
+    if not arguments:
+        return NO_PARAMETERS
+    return tuple((param_name, param_data.get('type', 'integer'))
+                 for arg_map in arguments
+                 for param_name, param_data in arg_map.items())
+
+def format_function_call(func_name: str, func_data: Dict[str, Any],
+                         call_args_cache: Dict[tuple, str]) -> str:
+    """Build the statement line calling a function with typed variables."""
+    return_type = func_data.get('return', 'integer')
+    func_args = func_data.get('arguments')
+    
+    # Build function call with appropriate parameters, using the
+    # variable that matches each argument type
+    if func_args:
+        signature = tuple(VAR_FOR_TYPE.get(arg_data.get('type', 'integer'), 'i')
+                          for arg in func_args
+                          for arg_data in arg.values())
+        call_args = call_args_cache.get(signature)
+        if call_args is None:
+            call_args = call_args_cache[signature] = ', '.join(signature)
+        func_call = f"{func_name}({call_args})"
+    else:
+        func_call = f"{func_name}()"
+    
+    # Assign to appropriate variable based on return type or just call if void
+    if return_type == 'void':
+        return f"        {func_call};\n"
+    return f"        {VAR_FOR_TYPE.get(return_type, 'i')}={func_call};\n"
+
+def generate_lsl_script(data: Dict[str, Any], out: TextIO) -> None:
+    """Write a minimal LSL script for syntax highlighting testing to out."""
+    
+    if not (data['constants'] or data['events'] or data['functions']):
+        out.write(EMPTY_SCRIPT)
+        return
+    
+    out.write(LSL_HEADER)
     
     # Add event handlers with correct parameters from XML
     for event_name, event_data in data['events'].items():
         parameters = get_event_parameters(event_data)
         
         # Build parameter string
-        if parameters:
-            param_strings = []
-            for param_name, param_type in parameters:
-                param_strings.append(f"{param_type} {param_name}")
-            param_str = ', '.join(param_strings)
-        else:
-            param_str = ""
+        param_str = ', '.join(f"{param_type} {param_name}"
+                              for param_name, param_type in parameters)
         
-        lsl_lines.append(f"    {event_name}({param_str})")
-        lsl_lines.append("    {")
+        out.write(f"    {event_name}({param_str})\n    {{\n")
         
         # Only add content to touch_start event
         if event_name == 'touch_start':
-            # Assign all constants to appropriate variables
-            for const_name, const_data in data['constants'].items():
-                const_type = const_data.get('type', 'integer')
-                const_value = const_data.get('value', '0')
-                
-                # Convert hex string to LSL format
-                if const_value.startswith('0x'):
-                    const_value = const_value.replace('0x', '0x')
-                else:
-                    try:
-                        const_value = str(int(const_value))
-                    except ValueError:
-                        const_value = f'"{const_value}"'
-                
-                # Assign to appropriate variable based on type
-                if const_type == 'integer':
-                    lsl_lines.append(f"        i={const_name};")
-                elif const_type == 'float':
-                    lsl_lines.append(f"        f={const_name};")
-                elif const_type == 'string':
-                    lsl_lines.append(f"        s={const_name};")
-                elif const_type == 'key':
-                    lsl_lines.append(f"        k={const_name};")
-                elif const_type == 'vector':
-                    lsl_lines.append(f"        v={const_name};")
-                elif const_type == 'rotation':
-                    lsl_lines.append(f"        r={const_name};")
-                else:
-                    lsl_lines.append(f"        i={const_name};")  # default to integer
+            # Assign all constants to appropriate variables based on type
+            default_line = CONSTANT_LINES['integer']
+            out.write(''.join(
+                CONSTANT_LINES.get(const_data.get('type', 'integer'), default_line).format(name=const_name)
+                for const_name, const_data in data['constants'].items()))
             
             # Add built-in constants
-            lsl_lines.append("        r=ZERO_ROTATION;")
-            lsl_lines.append("        v=ZERO_VECTOR;")
-            lsl_lines.append("")
+            out.write("        r=ZERO_ROTATION;\n        v=ZERO_VECTOR;\n\n")
             
-            # Call all functions with appropriate parameters
-            for func_name, func_data in data['functions'].items():
-                return_type = func_data.get('return', 'integer')
-                
-                # Build function call with appropriate parameters
-                if 'arguments' in func_data and func_data['arguments']:
-                    args = []
-                    for arg in func_data['arguments']:
-                        for arg_name, arg_data in arg.items():
-                            arg_type = arg_data.get('type', 'integer')
-                            # Use appropriate variable based on argument type
-                            if arg_type == 'integer':
-                                args.append("i")
-                            elif arg_type == 'float':
-                                args.append("f")
-                            elif arg_type == 'string':
-                                args.append("s")
-                            elif arg_type == 'key':
-                                args.append("k")
-                            elif arg_type == 'vector':
-                                args.append("v")
-                            elif arg_type == 'rotation':
-                                args.append("r")
-                            elif arg_type == 'list':
-                                args.append("l")
-                            else:
-                                args.append("i")  # default to integer
-                    
-                    func_call = f"{func_name}({', '.join(args)})"
-                else:
-                    func_call = f"{func_name}()"
-                
-                # Assign to appropriate variable based on return type or just call if void
-                if return_type == 'void':
-                    lsl_lines.append(f"        {func_call};")
-                elif return_type == 'integer':
-                    lsl_lines.append(f"        i={func_call};")
-                elif return_type == 'float':
-                    lsl_lines.append(f"        f={func_call};")
-                elif return_type == 'string':
-                    lsl_lines.append(f"        s={func_call};")
-                elif return_type == 'key':
-                    lsl_lines.append(f"        k={func_call};")
-                elif return_type == 'vector':
-                    lsl_lines.append(f"        v={func_call};")
-                elif return_type == 'rotation':
-                    lsl_lines.append(f"        r={func_call};")
-                elif return_type == 'list':
-                    lsl_lines.append(f"        l={func_call};")
-                else:
-                    lsl_lines.append(f"        i={func_call};")  # default to integer
+            # Call all functions with appropriate parameters; many functions
+            # share a signature, so argument lists are cached by type
+            call_args_cache = {}
+            out.write(''.join(
+                format_function_call(func_name, func_data, call_args_cache)
+                for func_name, func_data in data['functions'].items()))
         else:
             # Empty body for other events
-            lsl_lines.append("        ")
+            out.write("        \n")
         
-        lsl_lines.append("    }")
-        lsl_lines.append("")
-    
-    lsl_lines.append("}")
+        out.write("    }\n\n")
     
-    return "\n".join(lsl_lines)
+    out.write(LSL_FOOTER)
+
+def inputs_tag(*paths: str) -> str:
+    """Identify the current version of the given files by mtime and size."""
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+    return ' '.join(parts)
+
+def read_tag(tag_file: str) -> str:
+    """Return the tag stored next to a generated file, or '' if missing."""
+    try:
+        with open(tag_file, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return ''
 
 def main():
-    # Parse the XML file
     xml_file = 'keywords.xml'  # Change this to your XML file path
-    data = parse_llsd_xml(xml_file)
+    output_file = 'syntax_test.lsl'
+    tag_file = output_file + '.tag'
     
-    # Generate LSL script
-    lsl_script = generate_lsl_script(data)
+    # Skip the whole run if the script was already generated from the same
+    # XML file and the same version of this generator
+    tag = inputs_tag(xml_file, __file__)
+    if os.path.exists(output_file) and read_tag(tag_file) == tag:
+        print(f"{output_file} is up to date with {xml_file}")
+        return
     
-    # Save to file
-    output_file = 'syntax_test.lsl'
+    # Parse the XML file
+    data = parse_llsd_xml(xml_file)
+    
+    # Generate LSL script straight into the output file
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(lsl_script)
+        generate_lsl_script(data, f)
+    with open(tag_file, 'w', encoding='utf-8') as f:
+        f.write(tag)
     
     print(f"LSL syntax test script generated and saved to {output_file}")
     